@@ -1,123 +1,322 @@
 import streamlit as st
 import pandas as pd
-import os, hashlib, shutil
+import numpy as np
+import os, hashlib, shutil, json
 from datetime import datetime
-import plotly.express as px
+from concurrent.futures import ThreadPoolExecutor, wait
+import openpyxl
+try: import python_calamine; XLSX_ENGINE="calamine"   # parser Rust bila tersedia
+except ImportError: XLSX_ENGINE="openpyxl"           # pandas membuka openpyxl read_only
 
 # ── CONFIG ─────────────────────────────────────────────
 DATA_FOLDER  = "data_daily_uploads"
 LATEST_FILE  = os.path.join(DATA_FOLDER, "latest.xlsx")
+LATEST_PARQ  = os.path.join(DATA_FOLDER, "latest.parquet")   # kembaran kolumnar latest.xlsx
 HISTORY_FILE = os.path.join(DATA_FOLDER, "upload_history.csv")
+DELTA_FILE   = os.path.join(DATA_FOLDER, "delta.json")
+REQUIRED_COLS = ['Regional','Witel','Status Proyek','Total Port','Datel','Ticket ID','Nama Proyek']
+CAT_COLS     = ['Regional','Witel','Datel','Status Proyek']   # kardinalitas rendah -> category
+WITEL_FMT    = {'%':'{:.1f}%','RANK':lambda v:'' if pd.isna(v) else f'{int(v)}',
+                **{c:'{:,.0f}' for c in ['On Going_Lop','On Going_Port','Go Live_Lop','Go Live_Port',
+                                         'Total Lop','Total Port','Penambahan GOLIVE H-1 vs HI']}}
+DATEL_FMT    = {'Total Port_On Going':'{:,.0f}','Total Port_Go Live':'{:,.0f}',
+                'Total Port':'{:,.0f}','%':'{:.1f}%','RANK':'{:,.0f}'}
+FIG_LAYOUT   = dict(transition_duration=0, uirevision='keep')   # tanpa animasi; zoom/legend bertahan antar rerun
 os.makedirs(DATA_FOLDER, exist_ok=True)
 
 # ── HELPERS ────────────────────────────────────────────
-@st.cache_data
+def read_xlsx(src):
+    # hanya kolom yg dipakai; kolom wajib yg hilang tetap tertangkap di validate()
+    return pd.read_excel(src, engine=XLSX_ENGINE, dtype_backend="pyarrow",
+                         usecols=lambda c: c in REQUIRED_COLS)
+
+def read_header(upl):
+    """Baris header sheet pertama saja (streaming), tanpa parse seluruh workbook."""
+    wb=openpyxl.load_workbook(upl,read_only=True)
+    try: hdr=next(wb.worksheets[0].iter_rows(min_row=1,max_row=1,values_only=True),())
+    finally: wb.close()
+    upl.seek(0)
+    return [c for c in hdr if c is not None]
+
+def read_table(xlsx_path, columns=None):
+    """Pakai kembaran .parquet bila ada (jauh lebih cepat), selain itu parse xlsx.
+    columns: proyeksi kolom; di parquet hanya kolom itu yg dibaca dari disk."""
+    parq=os.path.splitext(xlsx_path)[0]+".parquet"
+    if os.path.exists(parq): return pd.read_parquet(parq,columns=columns)   # metadata pandas memulihkan category
+    df=as_categories(read_xlsx(xlsx_path))
+    return df if columns is None else df[columns]
+
+def as_categories(df):
+    for c in CAT_COLS: df[c]=df[c].astype('category')
+    return df
+
+def save_parquet(df, path, tag):
+    tmp=f"{path}.{tag}.tmp"   # tag (hash upload): dua sesi tidak berbagi file tmp
+    try:
+        df.to_parquet(tmp, compression="zstd", index=False)
+        os.replace(tmp,path)
+    except (ValueError, TypeError, NotImplementedError):
+        # kolom yg tak bisa dikonversi Arrow: buang kembaran lama agar tidak basi
+        for p in (tmp,path):
+            if os.path.exists(p): os.remove(p)
+    finally:
+        if os.path.exists(tmp): os.remove(tmp)
+
+@st.cache_data(max_entries=2)   # upload sebelumnya tak dibaca lagi; batasi memori
 def load_excel(path):
-    return pd.read_excel(path)
+    return read_xlsx(path)
+
+@st.cache_data(max_entries=2)
+def load_latest(file_hash):
+    """latest.xlsx; file_hash hanya kunci cache (berubah setiap upload baru)."""
+    return read_table(LATEST_FILE)
+
+def save_file(path, upl, tag):
+    tmp=f"{path}.{tag}.tmp"
+    upl.seek(0)
+    try:
+        with open(tmp,"wb") as f: shutil.copyfileobj(upl,f,length=1<<20)
+        os.replace(tmp,path)   # inode baru -> snapshot hardlink lama tidak ikut tertimpa
+    finally:
+        if os.path.exists(tmp): os.remove(tmp)
 
-def save_file(path, upl):
-    with open(path,"wb") as f: f.write(upl.getbuffer())
+@st.cache_resource
+def _executor(): return ThreadPoolExecutor(max_workers=2)   # satu pool utk semua sesi
 
-def md5(b): return hashlib.md5(b).hexdigest()
+def content_hash(b): return hashlib.blake2b(b,digest_size=16).hexdigest()   # 32 hex, sama lebar dgn MD5
+
+def same_as_last(b, cur_hash, last_hash):
+    """Upload identik dgn terakhir? Riwayat lama bisa berisi MD5; MD5 hanya dihitung
+    bila ukuran sama dgn latest.xlsx (file beda ukuran pasti beda isi)."""
+    if last_hash is None: return False
+    if cur_hash==last_hash: return True
+    return (os.path.exists(LATEST_FILE) and len(b)==os.path.getsize(LATEST_FILE)
+            and hashlib.md5(b).hexdigest()==last_hash)
+
+def history_tail(n):
+    """n baris terakhir riwayat upload; hanya membaca ekor file, bukan seluruh CSV."""
+    if not os.path.exists(HISTORY_FILE): return pd.DataFrame(columns=['timestamp','file_hash'])
+    return _history_tail(n, os.path.getmtime(HISTORY_FILE))
+
+@st.cache_data(show_spinner=False)
+def _history_tail(n, mtime):
+    # mtime hanya kunci cache: berubah setiap kali riwayat di-append
+    cols=['timestamp','file_hash']
+    with open(HISTORY_FILE,"rb") as f:
+        pos=f.seek(0,os.SEEK_END); buf=b""
+        while pos>0 and buf.count(b"\n")<n+1:
+            step=min(4096,pos); pos-=step
+            f.seek(pos); buf=f.read(step)+buf
+    # baris pertama selalu header atau potongan baris -> dibuang
+    rows=[l.split(",")[:2] for l in buf.decode().splitlines()[1:] if l.strip()]
+    return pd.DataFrame(rows[-n:],columns=cols)
 
 def get_last_upload():
-    if os.path.exists(HISTORY_FILE):
-        h=pd.read_csv(HISTORY_FILE)
-        if not h.empty: return h.iloc[-1]["timestamp"], h.iloc[-1]["file_hash"]
+    h=history_tail(1)
+    if not h.empty: return h.iloc[-1]["timestamp"], h.iloc[-1]["file_hash"]
     return None,None
 
-def record_history():
+def snapshot(h):
+    """Hardlink latest.xlsx (+ kembaran parquet) ke previous_<h>.* bila belum ada."""
+    for src in (LATEST_FILE,LATEST_PARQ):
+        snap=os.path.join(DATA_FOLDER,f"previous_{h}"+os.path.splitext(src)[1])
+        if os.path.exists(src) and not os.path.exists(snap):
+            try: os.link(src,snap)   # hardlink: tanpa menyalin byte
+            except OSError: shutil.copy(src,snap)
+
+def restore_snapshot(h, tag):
+    """Kembalikan latest.* ke previous_<h>.* setelah penyimpanan gagal; tanpa snapshot -> dibuang."""
+    for dst in (LATEST_FILE,LATEST_PARQ):
+        snap=os.path.join(DATA_FOLDER,f"previous_{h}"+os.path.splitext(dst)[1])
+        if h and os.path.exists(snap):
+            if os.path.exists(dst) and os.path.samefile(snap,dst): continue   # masih utuh
+            tmp=f"{dst}.{tag}.tmp"
+            if os.path.exists(tmp): os.remove(tmp)
+            try: os.link(snap,tmp)
+            except OSError: shutil.copy(snap,tmp)
+            os.replace(tmp,dst)
+        elif os.path.exists(dst): os.remove(dst)
+
+def record_history(new_hash):
     now=datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    new_hash=md5(open(LATEST_FILE,"rb").read())
-    if os.path.exists(HISTORY_FILE):
-        h=pd.read_csv(HISTORY_FILE)
-        if not h.empty:
-            prev_hash=h.iloc[-1]['file_hash']
-            shutil.copy(LATEST_FILE, os.path.join(DATA_FOLDER,f"previous_{prev_hash}.xlsx"))
-            h=pd.concat([h, pd.DataFrame([[now,new_hash]],columns=['timestamp','file_hash'])])
-    else:
-        h=pd.DataFrame([[now,new_hash]],columns=['timestamp','file_hash'])
-    h.to_csv(HISTORY_FILE,index=False)
-
-def load_previous_df():
-    if os.path.exists(HISTORY_FILE):
-        h=pd.read_csv(HISTORY_FILE)
-        if len(h)>=2:
-            prev_hash=h.iloc[-2]['file_hash']
-            prev_path=os.path.join(DATA_FOLDER,f"previous_{prev_hash}.xlsx")
-            if os.path.exists(prev_path):
-                return pd.read_excel(prev_path)
+    snapshot(new_hash)   # sekali per upload, dinamai hash isinya sendiri
+    # append satu baris; tidak membaca/menulis ulang seluruh riwayat
+    new=not os.path.exists(HISTORY_FILE)
+    with open(HISTORY_FILE,"a",newline="") as f:
+        if new: f.write("timestamp,file_hash\n")
+        f.write(f"{now},{new_hash}\n")
+    _history_tail.clear()
+
+@st.cache_data(show_spinner=False, max_entries=2)
+def load_previous(prev_hash):
+    """Snapshot previous_<hash>.xlsx; nama berbasis isi, jadi cache tidak perlu di-invalidate."""
+    prev_path=os.path.join(DATA_FOLDER,f"previous_{prev_hash}.xlsx")
+    if os.path.exists(prev_path):
+        return read_table(prev_path)
     return pd.DataFrame()   # kosong bila tidak ada
 
-def validate(df):
-    need=['Regional','Witel','Status Proyek','Total Port','Datel','Ticket ID','Nama Proyek']
-    miss=[c for c in need if c not in df.columns]
+def previous_hash():
+    h=history_tail(2)
+    return h.iloc[-2]['file_hash'] if len(h)>=2 else None
+
+def filter_region(src, key, region):
+    """Data per Regional; src: 'latest' / 'previous'. 'All' langsung dari cache tabel penuh."""
+    if region=="All": return load_latest(key) if src=="latest" else load_previous(key)
+    return _region_slice(src,key,region)
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def _region_slice(src, key, region):
+    # slice ter-cache per (sumber, hash, region)
+    df=load_latest(key) if src=="latest" else load_previous(key)
+    if df.empty: return df
+    return df.loc[df['Regional']==region]
+
+@st.cache_data(show_spinner=False, max_entries=2)
+def regionals(file_hash):
+    """Daftar Regional utk selectbox; rerun tidak perlu membuka tabel penuh."""
+    return sorted(load_latest(file_hash)['Regional'].dropna().unique())
+
+def golive_delta(now, prev):
+    # jumlah dijadikan int64 bertanda dulu: Total Port bisa unsigned, delta bisa negatif
+    now_gl=now[now['Status Proyek']=='Go Live'].groupby('Witel',observed=True)['Total Port'].sum().astype('int64')
+    prev_gl=prev[prev['Status Proyek']=='Go Live'].groupby('Witel',observed=True)['Total Port'].sum().astype('int64')
+    return now_gl.sub(prev_gl.reindex(now_gl.index,fill_value=0)).to_dict()
+
+def materialize_on_upload(df, prev_path):
+    """Delta Go Live per Witel untuk 'All' dan tiap Regional (dari data yg sudah difilter,
+    sama seperti tampilan dashboard); dihitung sekali saat upload, disimpan lewat save_delta()."""
+    delta={}
+    if os.path.exists(prev_path):
+        df_prev=read_table(prev_path,columns=['Regional','Witel','Status Proyek','Total Port'])
+        delta['All']=golive_delta(df,df_prev)
+        for r in df['Regional'].dropna().unique():
+            delta[r]=golive_delta(df[df['Regional']==r],df_prev[df_prev['Regional']==r])
+    return delta
+
+def save_delta(delta, tag):
+    # tmp unik per upload + os.replace: sesi lain tidak pernah membaca file setengah jadi
+    tmp=f"{DELTA_FILE}.{tag}.tmp"
+    with open(tmp,"w") as f: json.dump(delta,f)
+    os.replace(tmp,DELTA_FILE)
+
+def load_delta():
+    if os.path.exists(DELTA_FILE):
+        with open(DELTA_FILE) as f: return json.load(f)
+    return {}
+
+def validate_header(cols):
+    miss=[c for c in REQUIRED_COLS if c not in cols]
     if miss: return False,f"Kolom hilang: {', '.join(miss)}"
-    try: df['Total Port']=pd.to_numeric(df['Total Port'],errors='raise')
-    except: return False,"'Total Port' harus numerik"
     return True,"OK"
 
+def validate(df):
+    """(ok, pesan, df bersih); df masukan (hasil cache) tidak diubah."""
+    ok,msg=validate_header(df.columns)
+    if not ok: return ok,msg,df
+    try: port=pd.to_numeric(df['Total Port'],errors='raise',downcast='unsigned')
+    except: return False,"'Total Port' harus numerik",df
+    return True,"OK",as_categories(df.assign(**{'Total Port':port}))
+
 # ── PIVOT & DELTA ──────────────────────────────────────
-def build_pivots(df, df_prev):
-    df['LoP']=1
+def agg_status(df):
+    """LoP (jumlah tiket) & Total Port per Witel x Datel x Status Proyek; Datel kosong tetap dihitung."""
+    g=(df.groupby(['Witel','Datel','Status Proyek'],observed=True,dropna=False)
+         .agg(LoP=('Ticket ID','size'),**{'Total Port':('Total Port','sum')}))
+    return g.unstack('Status Proyek',fill_value=0)
+
+def rank_min_desc(grp, vals):
+    """Rank 'min' menurun per grup (setara groupby().rank(method='min', ascending=False))."""
+    order=np.lexsort((-vals,grp))
+    g,v=grp[order],vals[order]
+    pos=np.arange(len(order))
+    new_g=np.r_[True,g[1:]!=g[:-1]]
+    new_v=new_g|np.r_[True,v[1:]!=v[:-1]]
+    r=np.empty(len(order),dtype=np.int64)
+    r[order]=np.maximum.accumulate(np.where(new_v,pos,0))-np.maximum.accumulate(np.where(new_g,pos,0))+1
+    return r
+
+def build_pivots(df, delta):
+    # hanya kolom yg dipakai pivot; baris tanpa kunci grup dibuang di awal
+    df=df[['Witel','Datel','Status Proyek','Total Port','Ticket ID']].dropna(subset=['Witel','Status Proyek'])
+
+    # satu group-by di level Datel; level Witel diturunkan dengan menjumlah Datel
+    g=agg_status(df)
 
     # --- Witel pivot
-    w=df.pivot_table(values=['LoP','Total Port'],index='Witel',columns='Status Proyek',
-                     aggfunc='sum',fill_value=0,margins=True,margins_name='Grand Total')
+    w=g.groupby(level='Witel',observed=True).sum()
+    for v in ['LoP','Total Port']: w[(v,'Grand Total')]=w[v].sum(axis=1)
+    w.loc['Grand Total']=w.sum()
     w.columns=['_'.join(c) for c in w.columns]
-    w['%']=(w.get('Total Port_Go Live',0)/w['Total Port_Grand Total']).fillna(0)*100
+    w=w.astype(np.int32)   # jumlah port/LoP muat di int32
+    w['%']=((w.get('Total Port_Go Live',0)/w['Total Port_Grand Total']).fillna(0)*100).astype(np.float32)
 
     # Rank mulai dari 1 (tanpa Grand Total)
     non_gt=w.loc[w.index!='Grand Total','Total Port_Grand Total']
-    ranks=non_gt.rank(ascending=False,method='dense').astype('Int64')
-    w['RANK']=pd.NA
-    w.loc[ranks.index,'RANK']=ranks
+    _,dense=np.unique(-non_gt.to_numpy(),return_inverse=True)
+    w['RANK']=pd.Series(dense+1,index=non_gt.index,dtype='Int64')
 
-    # delta Go Live per Witel
-    delta={}
-    if not df_prev.empty:
-        now_gl=df[df['Status Proyek']=='Go Live'].groupby('Witel')['Total Port'].sum()
-        prev_gl=df_prev[df_prev['Status Proyek']=='Go Live'].groupby('Witel')['Total Port'].sum()
-        for wtl in now_gl.index:
-            delta[wtl]=int(now_gl[wtl]-prev_gl.get(wtl,0))
-    w['Δ Go Live']=[delta.get(wtl,0) for wtl in w.index]
+    # delta Go Live per Witel (sudah dihitung saat upload)
+    w['Δ Go Live']=w.index.map(delta).fillna(0).astype(np.int32)
 
     # --- Datel pivot
-    d=df.pivot_table(values=['LoP','Total Port'],index=['Witel','Datel'],columns='Status Proyek',
-                     aggfunc='sum',fill_value=0)
+    d=g[g.index.get_level_values('Datel').notna()]
     d.columns=['_'.join(c) for c in d.columns]
+    d=d.astype(np.int32)
     d['Total Port']=d.get('Total Port_On Going',0)+d.get('Total Port_Go Live',0)
-    d['%']=(d.get('Total Port_Go Live',0)/d['Total Port']).fillna(0)*100
-    d['RANK']=d.groupby(level=0)['Total Port'].rank(ascending=False,method='min').astype('Int64')
+    d['%']=((d.get('Total Port_Go Live',0)/d['Total Port']).fillna(0)*100).astype(np.float32)
+    d['RANK']=pd.array(rank_min_desc(d.index.codes[0],d['Total Port'].to_numpy()),dtype='Int64')
     return w,d
 
-# ── UI ─────────────────────────────────────────────────
-st.set_page_config("Delta Ticket Harian",layout="wide")
-page=st.sidebar.radio("Mode",["Dashboard","Upload Data"])
+@st.cache_data(max_entries=32)   # cukup utk semua Regional dari beberapa upload terakhir
+def compute_pivots(file_hash, region, delta):
+    """Pivot ter-cache; delta ikut jadi kunci cache karena dibaca di luar (delta.json)."""
+    return build_pivots(filter_region("latest",file_hash,region), delta)
 
-# ============ DASHBOARD ============
-if page=="Dashboard":
-    st.title("📊 Dashboard Deployment PT2 IHLD")
-    if not os.path.exists(LATEST_FILE):
-        st.info("Belum ada data. Silakan upload terlebih dahulu.")
-        st.stop()
+@st.cache_resource(max_entries=32)   # sejajar compute_pivots; figure hash lama dibuang
+def make_figures(file_hash, region, _witels, _dp, _base):
+    """Figure Plotly per (file_hash, region); objek Figure dipakai ulang antar rerun."""
+    import plotly.express as px   # impor berat; halaman Upload tidak pernah memuatnya
+    # satu figure facet untuk semua Witel
+    n_rows=-(-len(_witels)//3)
+    datel=px.bar(_dp, x='Datel',
+                 y=['Total Port_On Going','Total Port_Go Live'],
+                 facet_col='Witel', facet_col_wrap=3,
+                 category_orders={'Witel':_witels},
+                 barmode='stack',
+                 labels={'value':'Port','variable':'Status'},
+                 title='Status Port per Datel',
+                 color_discrete_sequence=px.colors.qualitative.Set2,
+                 height=max(1,n_rows)*320)
+    datel.update_xaxes(matches=None,showticklabels=True)
+    datel.for_each_annotation(lambda a:a.update(text=a.text.split('=')[-1]))
+
+    # satu trace, warna per batang (color='Witel' membuat satu trace per Witel)
+    pal=px.colors.qualitative.Pastel
+    bar=px.bar(_base,x='Witel',y='Total Port',text='Total Port',title='Total Port per Witel')
+    bar.update_traces(textposition='outside',marker_color=[pal[i%len(pal)] for i in range(len(_base))])
+    pie=px.pie(_base,names='Witel',values='Total Port',title='Distribusi Total Port',hole=.35)
+    datel.update_traces(marker_line_width=0)   # tanpa garis tepi per segmen stack
+    for f in (datel,bar,pie): f.update_layout(**FIG_LAYOUT)
+    return {'datel':datel,'bar':bar,'pie':pie}
 
-    df_now=load_excel(LATEST_FILE)
-    df_prev=load_previous_df()
+# ── UI ─────────────────────────────────────────────────
+@st.fragment
+def dashboard_body():
+    """Isi dashboard; ganti Regional hanya me-rerun fragment ini, bukan seluruh skrip."""
+    _,last_hash=get_last_upload()
+    prev_hash=previous_hash()
 
     # filter regional
-    regs=['All']+sorted(df_now['Regional'].dropna().unique())
+    regs=['All']+regionals(last_hash)
     reg_sel=st.selectbox("Filter Regional", regs)
-    if reg_sel!="All":
-        df_now=df_now[df_now['Regional']==reg_sel]
-        df_prev=df_prev[df_prev['Regional']==reg_sel] if not df_prev.empty else df_prev
+    df_now=filter_region("latest",last_hash,reg_sel)
+    df_prev=filter_region("previous",prev_hash,reg_sel) if prev_hash else pd.DataFrame()
 
     # 🚀 Go Live HI (baru saja berubah)
-    if not df_prev.empty:
-        prev_ticket=set(df_prev[df_prev['Status Proyek']=='Go Live']['Ticket ID'])
-        golive_hi=df_now[(df_now['Status Proyek']=='Go Live') & (~df_now['Ticket ID'].isin(prev_ticket))]
-    else:
-        golive_hi=df_now[df_now['Status Proyek']=='Go Live']  # jika upload pertama
+    # upload pertama: prev_ids kosong -> semua Go Live dianggap baru
+    prev_ids=pd.Index([] if df_prev.empty else
+                      df_prev.loc[df_prev['Status Proyek'].eq('Go Live'),'Ticket ID'].to_numpy())
+    golive_hi=df_now.loc[df_now['Status Proyek'].eq('Go Live') & ~df_now['Ticket ID'].isin(prev_ids)]
 
     st.subheader("🚀 Proyek Go Live - HI (baru)")
     if golive_hi.empty:
@@ -127,7 +326,7 @@ if page=="Dashboard":
                      use_container_width=True, height=250)
 
     # Build pivots
-    witel_pivot, datel_pivot = build_pivots(df_now, df_prev)
+    witel_pivot, datel_pivot = compute_pivots(last_hash, reg_sel, load_delta().get(reg_sel,{}))
 
     # tampil tabel witel (struktur yg Anda inginkan)
     for col in ['LoP_On Going','Total Port_On Going','LoP_Go Live','Total Port_Go Live',
@@ -148,63 +347,58 @@ if page=="Dashboard":
     })
 
     st.subheader("📌 Rekapitulasi per Witel")
-    def style_w(r):
-        if r['Witel']=='Grand Total': return ['background-color:#fff4b2;font-weight:bold']*len(r)
-        if r['RANK']==1:              return ['background-color:#d4f1f9']*len(r)
-        return ['']*len(r)
+    def style_w(t):
+        # satu mask per baris, di-broadcast ke semua kolom (tanpa callback per baris)
+        css=np.where(t['Witel'].to_numpy()=='Grand Total','background-color:#fff4b2;font-weight:bold',
+                     np.where(t['RANK'].eq(1).to_numpy(dtype=bool,na_value=False),'background-color:#d4f1f9',''))
+        return np.broadcast_to(css[:,None],t.shape)
 
     st.dataframe(
         wdf.style
-           .format({'%':'{:.1f}%','RANK':lambda v:'' if pd.isna(v) else f'{int(v)}',
-                    **{c:'{:,.0f}' for c in ['On Going_Lop','On Going_Port','Go Live_Lop',
-                                             'Go Live_Port','Total Lop','Total Port',
-                                             'Penambahan GOLIVE H-1 vs HI']}})
-           .apply(style_w,axis=1),
-        use_container_width=True, height=360)
+           .format(WITEL_FMT)
+           .apply(style_w,axis=None),
+        use_container_width=True, height=360, key="witel_summary")
 
     # Datel tabs
     st.subheader("🏆 Rekap per Datel")
-    w_nonGT=wdf[wdf['Witel']!='Grand Total']['Witel']
+    plot_df=wdf.loc[wdf['Witel']!='Grand Total']   # sekali filter, dipakai tab & semua grafik
+    w_nonGT=plot_df['Witel']
+    dp=datel_pivot.reset_index()
+    # kolom fallback
+    for c in ['Total Port_On Going','Total Port_Go Live','Total Port','%','RANK']:
+        if c not in dp: dp[c]=0
+    groups=dict(list(dp.groupby('Witel',sort=False,observed=True)))   # sekali group, lookup per tab
     tabs=st.tabs(w_nonGT.tolist())
     for i,w in enumerate(w_nonGT):
         with tabs[i]:
-            sub=datel_pivot[datel_pivot.index.get_level_values(0)==w].reset_index()
-            sub=sub.sort_values('RANK')
-            # kolom fallback
-            for c in ['Total Port_On Going','Total Port_Go Live','Total Port','%','RANK']:
-                if c not in sub: sub[c]=0
+            sub=groups.get(w,dp.iloc[:0]).sort_values('RANK')
             show=sub[['Datel','Total Port_On Going','Total Port_Go Live','Total Port','%','RANK']]
-            st.dataframe(show.style.format({
-                'Total Port_On Going':'{:,.0f}',
-                'Total Port_Go Live':'{:,.0f}',
-                'Total Port':'{:,.0f}',
-                '%':'{:.1f}%',
-                'RANK':'{:,.0f}'
-            }).applymap(lambda v:'background-color:#d4f1f9' if v==1 else '',subset=['RANK']),
-            use_container_width=True, height=260)
-
-            fig=px.bar(sub, x='Datel',
-                       y=['Total Port_On Going','Total Port_Go Live'],
-                       barmode='stack',
-                       labels={'value':'Port','variable':'Status'},
-                       title=f'Status Port di {w}',
-                       color_discrete_sequence=px.colors.qualitative.Set2)
-            st.plotly_chart(fig,use_container_width=True)
+            st.dataframe(show.style.format(DATEL_FMT)
+                             .apply(lambda r:np.where(r.eq(1).to_numpy(dtype=bool,na_value=False),'background-color:#d4f1f9',''),
+                                    subset=['RANK']),
+                         use_container_width=True, height=260, key=f"datel_{w}")
+
+    base=plot_df.sort_values('Total Port',ascending=False)
+    figs=make_figures(last_hash,reg_sel,w_nonGT.tolist(),dp,base)
+    st.plotly_chart(figs['datel'],use_container_width=True)
 
     # Summary charts
     st.subheader("🎯 Ringkasan Grafik")
-    base=wdf[wdf['Witel']!='Grand Total'].sort_values('Total Port',ascending=False)
     c1,c2=st.columns(2)
-    with c1:
-        bar=px.bar(base,x='Witel',y='Total Port',text='Total Port',
-                   title='Total Port per Witel',
-                   color='Witel',color_discrete_sequence=px.colors.qualitative.Pastel)
-        bar.update_traces(textposition='outside')
-        st.plotly_chart(bar,use_container_width=True)
-    with c2:
-        st.plotly_chart(px.pie(base,names='Witel',values='Total Port',
-                               title='Distribusi Total Port',hole=.35),
-                        use_container_width=True)
+    with c1: st.plotly_chart(figs['bar'],use_container_width=True)
+    with c2: st.plotly_chart(figs['pie'],use_container_width=True)
+
+st.set_page_config("Delta Ticket Harian",layout="wide")
+page=st.sidebar.radio("Mode",["Dashboard","Upload Data"])
+
+# ============ DASHBOARD ============
+if page=="Dashboard":
+    st.title("📊 Dashboard Deployment PT2 IHLD")
+    if not os.path.exists(LATEST_FILE):
+        st.info("Belum ada data. Silakan upload terlebih dahulu.")
+        st.stop()
+
+    dashboard_body()
 
 # ============ UPLOAD ============
 else:
@@ -214,19 +408,37 @@ else:
 
     upl=st.file_uploader("Pilih file .xlsx",type="xlsx")
     if upl:
-        if last_hash and md5(upl.getvalue())==last_hash:
+        cur_hash=content_hash(upl.getbuffer())   # sekali hash, dipakai ulang di record_history
+        if same_as_last(upl.getbuffer(),cur_hash,last_hash):
             st.success("✅ Data sama dengan upload terakhir.")
         else:
-            df=load_excel(upl)
-            ok,msg=validate(df)
+            ok,msg=validate_header(read_header(upl))   # gagal cepat sebelum parse penuh
+            if ok:
+                ok,msg,df=validate(load_excel(upl))
             if not ok: st.error(msg)
             else:
-                save_file(LATEST_FILE,upl)
-                record_history()
-                st.success("✅ Upload berhasil & dashboard diperbarui!")
-                st.balloons()
-                st.dataframe(df.head(),use_container_width=True)
+                with st.spinner("Menyimpan data..."):
+                    delta=materialize_on_upload(df,LATEST_FILE)   # LATEST_FILE masih data sebelumnya
+                    # data lama dari sebelum skema hardlink belum punya snapshot -> buat sebelum ditimpa
+                    if last_hash: snapshot(last_hash)
+                    # xlsx & parquet ditulis paralel (tulis disk dan encode zstd melepas GIL)
+                    futs=[_executor().submit(save_file,LATEST_FILE,upl,cur_hash),
+                          _executor().submit(save_parquet,df,LATEST_PARQ,cur_hash)]
+                    wait(futs)
+                    err=next((f.exception() for f in futs if f.exception()),None)
+                    if err:
+                        # xlsx/parquet bisa tinggal setengah baru -> kembali ke upload sebelumnya
+                        restore_snapshot(last_hash,cur_hash)
+                    else:
+                        record_history(cur_hash)
+                        save_delta(delta,cur_hash)   # baru ditulis setelah upload benar-benar tersimpan
+                if err: st.error(f"Gagal menyimpan upload: {err}")
+                else:
+                    _region_slice.clear()   # slice hash lama tidak akan dipakai lagi
+                    st.success("✅ Upload berhasil & dashboard diperbarui!")
+                    st.balloons()
+                    st.dataframe(df.head(),use_container_width=True)
 
 if page=="Upload Data" and os.path.exists(HISTORY_FILE):
     st.sidebar.subheader("Riwayat Upload")
-    st.sidebar.dataframe(pd.read_csv(HISTORY_FILE).tail(5),hide_index=True)
+    st.sidebar.table(history_tail(5),hide_index=True)   # 5 baris statis, tanpa grid interaktif